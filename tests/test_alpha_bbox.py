@@ -0,0 +1,62 @@
+"""alpha_bbox matches Image.getbbox() at threshold 0 and ignores faint alpha above it"""
+import pytest
+from PIL import Image
+
+import optimize
+
+
+def make_alpha(size=(120, 90), box=(17, 23, 88, 61)):
+    alpha = Image.new('L', size, 0)
+    alpha.paste(200, box)
+    alpha.putpixel((5, 80), 1)
+    return alpha
+
+
+def make_image(kind):
+    alpha = make_alpha()
+    if kind == 'RGBA':
+        image = Image.new('RGB', alpha.size, (30, 120, 200))
+        image.putalpha(alpha)
+    elif kind == 'LA':
+        image = Image.new('L', alpha.size, 90)
+        image.putalpha(alpha)
+    elif kind == 'PA':
+        image = Image.new('P', alpha.size, 3)
+        image.putpalette([value for index in range(256) for value in (index, 255 - index, 0)])
+        image.putalpha(alpha)
+    elif kind == 'P+tRNS':
+        image = Image.new('P', alpha.size, 0)
+        image.putpalette([0, 0, 0, 250, 40, 40])
+        image.paste(1, (17, 23, 88, 61))
+        image.info['transparency'] = 0
+    elif kind == 'RGB+tRNS':
+        image = Image.new('RGB', alpha.size, (255, 255, 255))
+        image.paste((10, 20, 30), (17, 23, 88, 61))
+        image.info['transparency'] = (255, 255, 255)
+    elif kind == 'transparent':
+        image = Image.new('RGBA', alpha.size, (255, 0, 0, 0))
+    return image
+
+
+@pytest.mark.parametrize('kind', ['RGBA', 'LA', 'PA', 'P+tRNS', 'RGB+tRNS', 'transparent'])
+def test_threshold_zero_matches_getbbox(kind):
+    image = make_image(kind)
+    assert optimize.alpha_bbox(image, 0) == image.convert('RGBA').getbbox()
+
+
+def test_opaque_image_keeps_full_extent():
+    image = Image.new('RGB', (40, 30), (1, 2, 3))
+    assert optimize.alpha_bbox(image) == (0, 0, 40, 30)
+
+
+def test_threshold_ignores_noise():
+    image = make_image('RGBA')
+    # Faint anti-aliasing noise (alpha 1-8) all over the transparent margin
+    for position, value in [((0, 0), 8), ((119, 89), 3), ((60, 2), 5), ((110, 45), 1)]:
+        image.putpixel(position, (0, 0, 0, value))
+    
+    assert optimize.alpha_bbox(image, 0) == (0, 0, 120, 90)
+    assert optimize.alpha_bbox(image, 8) == (17, 23, 88, 61)
+    # Pixels above the threshold still count
+    assert optimize.alpha_bbox(image, 7) == (0, 0, 88, 61)
+    assert optimize.alpha_bbox(image, 200) is None
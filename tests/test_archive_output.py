@@ -0,0 +1,32 @@
+"""--output-archive names members relative to the sources and never outside the archive root"""
+import zipfile
+
+import pytest
+
+import optimize
+
+
+def test_writer_rejects_paths_outside_root(tmp_path):
+    writer = optimize.ArchiveWriter(tmp_path / 'out.zip', tmp_path / 'root')
+    assert writer.write(tmp_path / 'root' / 'png' / 'a.png', b'a').exception() is None
+    with pytest.raises(ValueError):
+        writer.write(tmp_path / 'elsewhere' / 'a.png', b'b').result()
+    writer.close()
+
+    assert zipfile.ZipFile(tmp_path / 'out.zip').namelist() == ['png/a.png']
+
+
+def test_single_file_outside_working_directory(tmp_path, monkeypatch):
+    source = tmp_path / 'images' / 'a.png'
+    source.parent.mkdir()
+    image = optimize.Image.new('RGBA', (64, 64))
+    image.paste((255, 0, 0, 255), (16, 16, 48, 48))
+    image.save(source)
+    work_dir = tmp_path / 'work' / 'nested'
+    work_dir.mkdir(parents=True)
+    monkeypatch.chdir(work_dir)
+    monkeypatch.setattr('sys.argv', ['optimize.py', str(source), '--output-archive', 'out.zip', '--jobs', '1'])
+
+    optimize.main()
+    names = zipfile.ZipFile(work_dir / 'out.zip').namelist()
+    assert sorted(names) == ['jpg/a.jpg', 'png-1080x1080/a.png', 'png-padded/a.png', 'png/a.png']
@@ -0,0 +1,61 @@
+"""run_batch_cli summarizes results as they arrive and only keeps them for --report; bad flags exit early"""
+import json
+
+import pytest
+
+import optimize
+
+
+def fail_write_report(*args):
+    raise AssertionError('write_report called without a report path')
+
+
+class FakeProcessor:
+    jobs = 1
+    max_memory = None
+    recompress_profile = None
+    
+    def __init__(self, count):
+        self.count = count
+    
+    def run(self, files):
+        for index in range(self.count):
+            stats = [{'folder': 'jpg', 'format': 'JPEG', 'bytes': 1000, 'seconds': 0.5}]
+            if index % 3 == 2:
+                yield optimize.FileResult(f"copy{index}.png", 'ok', output_stats=stats,
+                                          timings={'saved': 2.0}, duplicate_of='original.png')
+            else:
+                yield optimize.FileResult(f"file{index}.png", 'ok', output_stats=stats, timings={'total': 0.5})
+
+
+def test_summary_without_report(monkeypatch, capsys):
+    summaries = []
+    monkeypatch.setattr(optimize, 'print_format_report', summaries.append)
+    monkeypatch.setattr(optimize, 'write_report', fail_write_report)
+    
+    assert optimize.run_batch_cli(iter(()), FakeProcessor(9))
+    assert summaries == [{'jpg': {'format': 'JPEG', 'files': 9, 'bytes': 9000, 'seconds': 4.5}}]
+    # Duplicate totals are counted along the way too
+    assert optimize._('duplicates_saved', count=3, seconds=6.0) in capsys.readouterr().out
+
+
+def test_report_lists_every_file(tmp_path):
+    report = tmp_path / 'report.json'
+    assert optimize.run_batch_cli(iter(()), FakeProcessor(6), report_path=str(report))
+    
+    data = json.loads(report.read_text(encoding='utf-8'))
+    assert [entry['path'] for entry in data['files']] == [
+        'file0.png', 'file1.png', 'copy2.png', 'file3.png', 'file4.png', 'copy5.png']
+    assert data['formats']['jpg']['files'] == 6
+    assert data['duplicates'] == {'files': 2, 'seconds_saved': 4.0}
+
+
+@pytest.mark.parametrize('argv', [['--watch'], ['--shard', '1/2'], ['--watch', 'a.png'], ['--gui', '--watch']])
+def test_invalid_arguments_exit_before_the_gui(monkeypatch, argv):
+    def no_gui():
+        raise AssertionError('GUI launched')
+    monkeypatch.setattr(optimize, 'ImageExporterGUI', no_gui)
+    monkeypatch.setattr('sys.argv', ['optimize.py'] + argv)
+    with pytest.raises(SystemExit) as excinfo:
+        optimize.main()
+    assert excinfo.value.code == 2
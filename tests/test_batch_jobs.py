@@ -0,0 +1,114 @@
+"""BatchProcessor with several worker processes: result records, crashing workers, cancellation"""
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+import optimize
+
+
+original_process_file = optimize.process_file
+
+
+def crash_on_crash_png(png_path, *args, **kwargs):
+    """Stands in for process_file in the workers; kills the worker for crash.png"""
+    if Path(str(png_path)).name == 'crash.png':
+        os._exit(1)
+    return original_process_file(png_path, *args, **kwargs)
+
+
+def slow_after_first(png_path, *args, **kwargs):
+    """Stands in for process_file in the workers; all files but the first keep a worker busy"""
+    if Path(str(png_path)).name != 'file0.png':
+        time.sleep(1)
+    return original_process_file(png_path, *args, **kwargs)
+
+
+def make_sources(tmp_path, names):
+    sources = []
+    for index, name in enumerate(names):
+        source = tmp_path / f"{name}.png"
+        optimize.make_synthetic_image(160, 'sparse', seed=index).save(source)
+        sources.append(str(source))
+    return sources
+
+
+def processor(**options):
+    return optimize.BatchProcessor(optimize.PADDING_PRESETS['large'], jobs=2,
+                                   exporter_options={'quiet': True, 'encoder_threads': 1}, **options)
+
+
+def test_results_from_worker_processes(tmp_path):
+    sources = make_sources(tmp_path, ['a', 'b', 'c'])
+    events = []
+    results = list(processor(event_sinks=[events.append], incremental=True).run(iter(sources)))
+
+    assert sorted(result.path for result in results) == sources
+    for result in results:
+        assert result.status == 'ok' and result.ok and result.error is None
+        assert len(result.outputs) == len(optimize.DEFAULT_RENDITIONS)
+        assert all(Path(output).exists() for output in result.outputs)
+        assert result.timings['total'] > 0
+        assert {stat['folder'] for stat in result.output_stats} == {
+            rendition['folder'] for rendition in optimize.DEFAULT_RENDITIONS}
+        assert all(stat['bytes'] > 0 for stat in result.output_stats)
+        # Fingerprint for the incremental manifest, taken before processing
+        assert result.source['size'] == os.path.getsize(result.path)
+        assert result.to_dict()['status'] == 'ok'
+    # Events collected in the workers reach the sinks in the parent
+    assert sorted(event['file'] for event in events if event['stage'] == 'file') == sources
+
+
+def test_crashing_worker_becomes_an_error(tmp_path, monkeypatch):
+    sources = make_sources(tmp_path, ['a', 'crash', 'b', 'c', 'd', 'e'])
+    monkeypatch.setattr(optimize, 'process_file', crash_on_crash_png)
+
+    results = {Path(result.path).name: result for result in processor().run(sources)}
+    assert len(results) == len(sources)
+    assert results['crash.png'].status == 'error'
+    assert 'terminated abruptly' in results['crash.png'].error
+    # Files in flight with it fail too, but later ones run in a fresh pool
+    assert results['d.png'].status == 'ok' and results['e.png'].status == 'ok'
+
+
+def test_cancel_yields_cancelled_results(tmp_path, monkeypatch):
+    monkeypatch.setattr(optimize, 'process_file', slow_after_first)
+    sources = make_sources(tmp_path, [f"file{index}" for index in range(8)])
+    batch = processor()
+    results = []
+    for result in batch.run(sources):
+        # file0 is done while both workers are busy and more files wait in the pool's queue
+        results.append(result)
+        batch.cancel()
+
+    statuses = [result.status for result in results]
+    assert set(statuses) <= {'ok', 'cancelled'}
+    assert 'cancelled' in statuses
+    assert len({result.path for result in results}) == len(results) < len(sources)
+    for result in results:
+        if result.status == 'cancelled':
+            assert not (tmp_path / 'png' / Path(result.path).name).exists()
+
+
+def test_cancel_reports_files_held_back_by_the_memory_budget(tmp_path, monkeypatch):
+    monkeypatch.setattr(optimize, 'process_file', slow_after_first)
+    sources = make_sources(tmp_path, [f"file{index}" for index in range(6)])
+    read = []
+
+    def reading():
+        for source in sources:
+            read.append(source)
+            yield source
+    # A budget below one file: each file runs alone and the next one is held back meanwhile
+    batch = processor(max_memory=1)
+    results = []
+    for result in batch.run(reading()):
+        results.append(result)
+        batch.cancel()
+
+    # Every file taken from the source is reported exactly once
+    assert sorted(result.path for result in results) == sorted(read)
+    assert len(read) < len(sources)
+    # The last file read was waiting for memory when the batch was cancelled
+    assert {result.path: result.status for result in results}[read[-1]] == 'cancelled'
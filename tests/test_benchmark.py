@@ -0,0 +1,94 @@
+"""Benchmark suite: stage timings on synthetic images, optionally checked against a baseline.
+
+By default the images are small so the suite runs with the other tests. For real numbers:
+
+    BENCHMARK_SIZES="1000 4000" BENCHMARK_OUTPUT=bench.json python -m pytest tests/test_benchmark.py
+    BENCHMARK_SIZES="1000 4000" BENCHMARK_BASELINE=bench.json python -m pytest tests/test_benchmark.py
+"""
+import json
+import os
+
+import pytest
+
+import optimize
+
+
+SIZES = [int(size) for size in os.environ.get('BENCHMARK_SIZES', '400').split()]
+REPEAT = int(os.environ.get('BENCHMARK_REPEAT', '1'))
+DENSITIES = ['sparse', 'dense', 'opaque']
+
+EXPECTED_STAGES = {'decode', 'trim_getbbox', 'trim', 'resize_1080', 'pad_1920', 'resize_pad_fast',
+                   'composite', 'render_jpeg_all', 'encode_png_fast', 'encode_png_balanced',
+                   'encode_png_max', 'encode_jpeg'}
+
+
+@pytest.fixture(scope='module')
+def results(tmp_path_factory):
+    """Benchmark results in the format of 'optimize.py benchmark --output', collected by the tests"""
+    collected = {'cases': {}}
+    yield collected
+    if os.environ.get('BENCHMARK_OUTPUT'):
+        with open(os.environ['BENCHMARK_OUTPUT'], 'w', encoding='utf-8') as f:
+            json.dump(collected, f, indent=2)
+
+
+@pytest.mark.parametrize('density', DENSITIES)
+@pytest.mark.parametrize('size', SIZES)
+def test_benchmark_image(tmp_path, results, size, density):
+    path = tmp_path / f"synthetic-{size}-{density}.png"
+    optimize.make_synthetic_image(size, density).save(path, "PNG", compress_level=1)
+    
+    stages, sizes = optimize.benchmark_image(path, REPEAT)
+    results['cases'][f"{size}-{density}"] = {'stages': stages, 'output_bytes': sizes}
+    
+    assert EXPECTED_STAGES <= set(stages)
+    assert all(0 <= timing['min'] <= timing['median'] for timing in stages.values())
+    assert all(size > 0 for size in sizes.values())
+    
+    if os.environ.get('BENCHMARK_BASELINE'):
+        with open(os.environ['BENCHMARK_BASELINE'], encoding='utf-8') as f:
+            baseline = json.load(f)
+        case = {'cases': {f"{size}-{density}": results['cases'][f"{size}-{density}"]}}
+        assert optimize.compare_benchmarks(baseline, case, 0.25, 0.01) == []
+
+
+def test_synthetic_images_are_deterministic():
+    first = optimize.make_synthetic_image(200, 'sparse', seed=3)
+    assert first.tobytes() == optimize.make_synthetic_image(200, 'sparse', seed=3).tobytes()
+    assert first.tobytes() != optimize.make_synthetic_image(200, 'sparse', seed=4).tobytes()
+    assert optimize.make_synthetic_image(200, 'opaque').mode == 'RGB'
+
+
+def test_compare_benchmarks_tolerance():
+    baseline = {'cases': {'1000-dense': {'stages': {'trim': {'min': 0.100}, 'pad_1920': {'min': 0.100}}}}}
+    results = {'cases': {'1000-dense': {'stages': {'trim': {'min': 0.120}, 'pad_1920': {'min': 0.200}}},
+                         '4000-dense': {'stages': {'trim': {'min': 1.0}}}}}
+    # 20% slower is within the tolerance, new cases have nothing to compare against
+    assert optimize.compare_benchmarks(baseline, results, 0.25) == [('1000-dense', 'pad_1920', 0.100, 0.200)]
+    # Slowdowns below min_delta are timer noise
+    assert optimize.compare_benchmarks(baseline, results, 0.25, min_delta=0.15) == []
+
+
+def test_benchmark_subcommand(tmp_path, capsys):
+    output = tmp_path / 'bench.json'
+    optimize.run_benchmark(['--sizes', '200', '--density', 'dense', '--repeat', '1',
+                            '--work-dir', str(tmp_path), '--output', str(output)])
+    data = json.loads(output.read_text(encoding='utf-8'))
+    assert set(data['cases']) == {'200-dense'}
+    assert data['pillow'] == optimize.PIL.__version__
+    
+    # Compared with itself there are no regressions
+    optimize.run_benchmark(['--sizes', '200', '--density', 'dense', '--repeat', '1',
+                            '--work-dir', str(tmp_path), '--compare', str(output), '--tolerance', '10'])
+    assert optimize._('benchmark_no_regressions') in capsys.readouterr().out
+
+
+def test_benchmark_report_is_translated(tmp_path, capsys, monkeypatch):
+    monkeypatch.setattr(optimize, 'CURRENT_LANG', 'de')
+    output = tmp_path / 'bench.json'
+    optimize.run_benchmark(['--sizes', '64', '--density', 'sparse', '--repeat', '1',
+                            '--work-dir', str(tmp_path), '--output', str(output)])
+    out = capsys.readouterr().out
+    assert 'Messe 64-sparse...' in out
+    assert '(Median ' in out
+    assert f"Ergebnisse nach {output} geschrieben" in out
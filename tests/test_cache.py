@@ -0,0 +1,99 @@
+"""--cache gives the same bytes as a fresh run, evicts least recently used masters and
+only reuses downscaled masters for canvases they are large enough for"""
+import time
+
+import pytest
+
+import optimize
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'product.png'
+    optimize.make_synthetic_image(400, 'sparse').save(path)
+    return path
+
+
+def cached_export(source, cache_path, padding='large', **options):
+    events = []
+    outputs = optimize.export_image(str(source), padding=padding, cache_path=str(cache_path),
+                                    event_sinks=[events.append], **options)
+    return outputs, {event['stage'] for event in events}
+
+
+@pytest.mark.parametrize('padding', ['large', 'small'])
+def test_cache_hit_is_byte_identical(tmp_path, source, padding):
+    cache_path = tmp_path / 'cache.db'
+    # Filled with another padding: the master does not depend on it
+    _outputs, stages = cached_export(source, cache_path, padding='medium')
+    assert 'cache_store' in stages
+
+    outputs, stages = cached_export(source, cache_path, padding=padding)
+    assert 'cache_hit' in stages
+    assert outputs == optimize.export_image(str(source), padding=padding)
+
+
+def test_trim_threshold_is_part_of_the_key(tmp_path, source):
+    cache_path = tmp_path / 'cache.db'
+    cached_export(source, cache_path)
+    _outputs, stages = cached_export(source, cache_path, trim_threshold=10)
+    assert 'cache_store' in stages
+
+
+def master(size):
+    return optimize.make_synthetic_image(size, 'dense')
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = optimize.AnalysisCache(tmp_path / 'cache.db')
+    for digest in ('a', 'b'):
+        cache.put(digest, 0, (64, 64), 'RGBA', None, False, master(64))
+        time.sleep(0.01)
+    entry_bytes = cache.get('a', 0)['bytes']
+    # 'a' was just used, so 'b' is the least recently used entry now
+    time.sleep(0.01)
+    cache.max_bytes = entry_bytes * 2 + entry_bytes // 2
+    cache.put('c', 0, (64, 64), 'RGBA', None, False, master(64))
+
+    assert cache.get('b', 0) is None
+    assert cache.get('a', 0) is not None and cache.get('c', 0) is not None
+    cache.close()
+
+
+def test_entry_larger_than_the_limit_is_not_kept(tmp_path):
+    cache = optimize.AnalysisCache(tmp_path / 'cache.db', max_bytes=10)
+    cache.put('a', 0, (64, 64), 'RGBA', None, False, master(64))
+    assert cache.get('a', 0) is None
+    cache.close()
+
+
+def entry(exact, longest=1000):
+    return {'exact': exact, 'master_width': longest, 'master_height': longest // 2}
+
+
+@pytest.mark.parametrize('master_size, renditions, exact, usable', [
+    (None, None, True, True),
+    (None, None, False, False),
+    # The full-size 'trim' rendition needs the exact master
+    (1000, None, False, False),
+    (1000, [{'folder': 'small', 'size': 400}], False, True),
+    (1000, [{'folder': 'big', 'size': 600}], False, False),
+])
+def test_master_usable(master_size, renditions, exact, usable):
+    exporter = optimize.ProductImageExporter(None, optimize.PADDING_PRESETS['large'], renditions=renditions,
+                                             master_size=master_size)
+    assert exporter.master_usable(entry(exact)) is usable
+
+
+def test_downscaled_master_serves_small_canvases(tmp_path, source):
+    cache_path = tmp_path / 'cache.db'
+    renditions = [{'folder': 'thumb', 'size': 100}]
+    _outputs, stages = cached_export(source, cache_path, renditions=renditions, master_size=250)
+    assert 'cache_store' in stages
+    _outputs, stages = cached_export(source, cache_path, renditions=renditions, master_size=250)
+    assert 'cache_hit' in stages
+
+    # The default renditions include the full-size PNG, which the downscaled master cannot serve
+    outputs, stages = cached_export(source, cache_path, master_size=250)
+    assert 'cache_hit' not in stages
+    assert outputs == optimize.export_image(str(source), padding='large')
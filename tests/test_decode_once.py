@@ -0,0 +1,142 @@
+"""The source is opened and decoded once per file, and the outputs match the original pipeline"""
+import random
+
+import pytest
+from PIL import Image, ImageFile
+
+import optimize
+
+
+OUTPUTS = [('png', '.png'), ('png-1080x1080', '.png'), ('png-padded', '.png'), ('jpg', '.jpg')]
+
+
+def make_source(kind):
+    """Return a test image with transparent margins (or none, depending on the mode)"""
+    rng = random.Random(kind)
+    if kind == 'empty':
+        return Image.new('RGBA', (64, 48), (0, 0, 0, 0))
+    if kind == 'tiny':
+        return Image.new('RGBA', (3, 2), (200, 10, 10, 255))
+    
+    image = Image.new('RGBA', (1400, 1000), (0, 0, 0, 0))
+    content = Image.effect_noise((900, 700), 60).convert('RGB')
+    content.putalpha(Image.linear_gradient('L').resize((900, 700)))
+    image.paste(content, (rng.randint(100, 400), rng.randint(50, 250)))
+    if kind == 'RGBA':
+        return image
+    if kind in ('LA', 'RGB', 'L', '1'):
+        return image.convert(kind)
+    if kind == 'I;16':
+        return image.convert('L').convert('I;16')
+    if kind == 'P':
+        return image.convert('RGB').quantize(64)
+    if kind == 'P+tRNS':
+        return image.convert('RGB').quantize(64)
+    if kind == 'RGB+tRNS':
+        return image.convert('RGB')
+    raise ValueError(kind)
+
+
+def save_source(kind, path):
+    image = make_source(kind)
+    if kind == 'P+tRNS':
+        image.save(path, transparency=image.getpixel((0, 0)))
+    elif kind == 'RGB+tRNS':
+        image.save(path, transparency=(0, 0, 0))
+    else:
+        image.save(path)
+
+
+def original_outputs(png_path, padding):
+    """The original export pipeline: decode per export, trim with getbbox, resize, pad, flatten"""
+    def load_trimmed():
+        image = Image.open(png_path)
+        if image.mode != 'RGBA':
+            image = image.convert('RGBA')
+        bbox = image.getbbox()
+        return image.crop(bbox) if bbox else image
+    
+    def encode(image, image_format, **options):
+        import io
+        buffer = io.BytesIO()
+        image.save(buffer, image_format, **options)
+        return buffer.getvalue()
+    
+    outputs = {}
+    trimmed = load_trimmed()
+    outputs['png'] = encode(trimmed, 'PNG', optimize=True)
+    if trimmed.size[0] <= 1080 and trimmed.size[1] <= 1080:
+        resized = trimmed.copy()
+    else:
+        ratio = min(1080 / trimmed.size[0], 1080 / trimmed.size[1])
+        resized = trimmed.resize((int(trimmed.size[0] * ratio), int(trimmed.size[1] * ratio)),
+                                 Image.Resampling.LANCZOS)
+    outputs['png-1080x1080'] = encode(resized, 'PNG', optimize=True)
+    
+    trimmed = load_trimmed()
+    _, top_percent, rest_percent = padding
+    top_padding = int(1920 * (top_percent / 100))
+    rest_padding = int(1920 * (rest_percent / 100))
+    ratio = min((1920 - rest_padding * 2) / trimmed.size[0],
+                (1920 - top_padding - rest_padding) / trimmed.size[1])
+    if ratio < 1:
+        trimmed = trimmed.resize((int(trimmed.size[0] * ratio), int(trimmed.size[1] * ratio)),
+                                 Image.Resampling.LANCZOS)
+    padded = Image.new('RGBA', (1920, 1920), (0, 0, 0, 0))
+    padded.paste(trimmed, ((1920 - trimmed.size[0]) // 2, 1920 - rest_padding - trimmed.size[1]), trimmed)
+    outputs['png-padded'] = encode(padded, 'PNG', optimize=True)
+    
+    flattened = Image.new('RGB', padded.size, (255, 255, 255))
+    flattened.paste(padded, (0, 0), padded)
+    outputs['jpg'] = encode(flattened, 'JPEG', quality=100, optimize=True)
+    return outputs
+
+
+@pytest.fixture
+def decode_counter(monkeypatch):
+    """Count source opens and actual pixel decodes (load() calls with tiles left to read)"""
+    counts = {'open': 0, 'decode': 0}
+    original_open = optimize.open_source
+    original_load = ImageFile.ImageFile.load
+    
+    def counting_open(*args, **kwargs):
+        counts['open'] += 1
+        return original_open(*args, **kwargs)
+    
+    def counting_load(self):
+        if self.tile:
+            counts['decode'] += 1
+        return original_load(self)
+    
+    monkeypatch.setattr(optimize, 'open_source', counting_open)
+    monkeypatch.setattr(ImageFile.ImageFile, 'load', counting_load)
+    return counts
+
+
+@pytest.mark.parametrize('low_memory', [False, True])
+def test_process_all_decodes_source_once(tmp_path, decode_counter, low_memory):
+    source = tmp_path / 'product.png'
+    save_source('RGBA', source)
+    
+    exporter = optimize.ProductImageExporter(str(source), optimize.PADDING_PRESETS['medium'],
+                                             quiet=True, low_memory=low_memory)
+    assert exporter.process_all()
+    
+    assert decode_counter == {'open': 1, 'decode': 1}
+    assert len(exporter.outputs) == len(OUTPUTS)
+
+
+@pytest.mark.parametrize('kind', ['RGB', 'RGBA', 'LA', 'P', 'P+tRNS', 'RGB+tRNS', 'L', '1', 'I;16',
+                                  'empty', 'tiny'])
+def test_outputs_match_original_pipeline(tmp_path, kind):
+    source = tmp_path / 'product.png'
+    save_source(kind, source)
+    padding = optimize.PADDING_PRESETS['medium']
+    
+    exporter = optimize.ProductImageExporter(str(source), padding, quiet=True)
+    assert exporter.process_all(), exporter.error
+    
+    expected = original_outputs(source, padding)
+    for folder, extension in OUTPUTS:
+        data = (tmp_path / folder / f'product{extension}').read_bytes()
+        assert data == expected[folder], folder
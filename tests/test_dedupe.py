@@ -0,0 +1,29 @@
+"""--dedupe-similar merges re-encoded copies but never colour variants of a product"""
+import optimize
+
+
+def save_product(path, colour, size=(200, 200)):
+    image = optimize.Image.new('RGBA', size)
+    image.paste(colour + (255,), (40, 30, 160, 170))
+    image.paste((255, 255, 255, 255), (80, 60, 120, 100))
+    image.save(path)
+    return path
+
+
+def test_colour_variants_are_not_merged(tmp_path):
+    red = save_product(tmp_path / 'red.png', (200, 30, 30))
+    blue = save_product(tmp_path / 'blue.png', (30, 30, 200))
+    # Same brightness gradients: the hashes alone would call these duplicates
+    red_bits, _ = optimize.difference_hash(red)
+    blue_bits, _ = optimize.difference_hash(blue)
+    assert bin(red_bits ^ blue_bits).count('1') <= 6
+
+    assert optimize.find_duplicates([red, blue], max_distance=6) == [[red], [blue]]
+
+
+def test_near_identical_copies_are_merged(tmp_path):
+    original = save_product(tmp_path / 'original.png', (200, 30, 30))
+    # Slightly different shade, e.g. a re-export with another colour profile
+    copy = save_product(tmp_path / 'copy.png', (205, 34, 28))
+
+    assert optimize.find_duplicates([original, copy], max_distance=4) == [[original, copy]]
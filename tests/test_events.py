@@ -0,0 +1,67 @@
+"""Per-stage events reach the JSON-lines and summary sinks, and cost nothing without sinks"""
+import json
+
+import pytest
+
+import optimize
+
+
+EVENT_FIELDS = {'stage', 'file', 'start', 'end', 'duration'}
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'product.png'
+    optimize.make_synthetic_image(200, 'sparse').save(path)
+    return path
+
+
+def run(source, sinks, **options):
+    processor = optimize.BatchProcessor(optimize.PADDING_PRESETS['large'], jobs=1, event_sinks=sinks,
+                                        exporter_options={'quiet': True}, **options)
+    return list(processor.run([str(source)]))
+
+
+def test_batch_run_emits_stage_events(tmp_path, source):
+    events_path = tmp_path / 'events.jsonl'
+    json_sink = optimize.JsonLinesSink(events_path)
+    summary_sink = optimize.SummarySink()
+    assert [result.status for result in run(source, [json_sink, summary_sink])] == ['ok']
+    json_sink.close()
+
+    events = [json.loads(line) for line in events_path.read_text(encoding='utf-8').splitlines()]
+    assert all(EVENT_FIELDS <= set(event) for event in events)
+    assert all(event['file'] == str(source) for event in events)
+    assert all(event['end'] >= event['start'] and event['duration'] >= 0 for event in events)
+    stages = [event['stage'] for event in events]
+    assert {'decode', 'trim', 'pad', 'composite', 'encode', 'file'} <= set(stages)
+    assert stages.count('encode') == len(optimize.DEFAULT_RENDITIONS)
+    assert stages[-1] == 'file'
+    encodes = [event for event in events if event['stage'] == 'encode']
+    assert all(event['bytes_out'] > 0 for event in encodes)
+
+    summary = summary_sink.summary()
+    assert summary['files'] == 1
+    assert summary['stages']['encode']['count'] == len(optimize.DEFAULT_RENDITIONS)
+    assert summary['stages']['file']['p50'] <= summary['stages']['file']['p95']
+
+
+def test_skipped_files_emit_a_skip_event(source):
+    run(source, [], incremental=True)
+    events = []
+    assert [result.status for result in run(source, [events.append], incremental=True)] == ['skipped']
+    assert [event['stage'] for event in events] == ['skip']
+
+
+def test_no_events_without_sinks(source, monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError('event built without a sink')
+    monkeypatch.setattr(optimize.ProductImageExporter, 'emit', fail)
+    results = run(source, [])
+    assert [result.status for result in results] == ['ok']
+    assert results[0].events == []
+
+
+@pytest.mark.parametrize('fraction, expected', [(0.5, 3), (0.95, 5), (0.0, 1), (1.0, 5)])
+def test_percentile(fraction, expected):
+    assert optimize.percentile([5, 1, 4, 2, 3], fraction) == expected
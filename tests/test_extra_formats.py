@@ -0,0 +1,64 @@
+"""--webp, --webp-lossless and --avif renditions: lossy ones on white like jpg/, lossless WebP like png-padded/"""
+import io
+
+import pytest
+from PIL import features
+
+import optimize
+
+
+requires_avif = pytest.mark.skipif(not features.check('avif'), reason='Pillow built without AVIF support')
+
+
+@pytest.fixture(scope='module')
+def image():
+    return optimize.make_synthetic_image(300, 'sparse')
+
+
+def small(name):
+    return dict(optimize.EXTRA_RENDITIONS[name], size=240)
+
+
+def export(image, *renditions):
+    return optimize.export_image(image, renditions=list(renditions))
+
+
+def opened(data):
+    image = optimize.Image.open(io.BytesIO(data))
+    image.load()
+    return image
+
+
+@pytest.mark.parametrize('name, image_format', [('webp', 'WEBP'), pytest.param('avif', 'AVIF', marks=requires_avif)])
+def test_lossy_renditions_are_flattened_on_white(image, name, image_format):
+    outputs = export(image, small(name))
+    assert list(outputs) == [f"{name}/image.{name}"]
+    output = opened(outputs[f"{name}/image.{name}"])
+    assert output.format == image_format and output.size == (240, 240)
+    assert 'A' not in output.getbands()
+    # The padding is the white background, give or take lossy compression
+    assert all(value >= 250 for value in output.convert('RGB').getpixel((2, 2)))
+
+
+def test_lossless_webp_matches_the_padded_png(image):
+    outputs = export(image, small('webp_lossless'), {'folder': 'png-padded', 'fit': 'pad', 'size': 240})
+    webp = opened(outputs['webp-lossless/image.webp'])
+    png = opened(outputs['png-padded/image.png'])
+    assert webp.format == 'WEBP' and webp.mode == 'RGBA'
+    png = png.convert('RGBA')
+    assert webp.getchannel('A').tobytes() == png.getchannel('A').tobytes()
+    # WebP may change the colour of fully transparent pixels; everything visible is identical
+    black = optimize.Image.new('RGBA', png.size, (0, 0, 0, 255))
+    assert (optimize.Image.alpha_composite(black, webp).tobytes()
+            == optimize.Image.alpha_composite(black, png).tobytes())
+
+
+@requires_avif
+def test_cli_flags_add_the_folders(tmp_path, image, monkeypatch):
+    source = tmp_path / 'image.png'
+    image.save(source)
+    monkeypatch.setattr('sys.argv', ['optimize.py', '--batch', str(source), '--jobs', '1', '--png-profile', 'fast',
+                                     '--webp', '--webp-lossless', '--avif'])
+    optimize.main()
+    for folder, suffix in [('webp', '.webp'), ('webp-lossless', '.webp'), ('avif', '.avif')]:
+        assert opened((tmp_path / folder / f"image{suffix}").read_bytes()).size == (1920, 1920)
@@ -0,0 +1,30 @@
+"""Importing the module and command line runs never load tkinter; only the GUI does"""
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def loads_tkinter(code):
+    result = subprocess.run([sys.executable, '-c', code + "\nprint('tkinter' in sys.modules)"], cwd=ROOT,
+                            capture_output=True, text=True, timeout=60)
+    return result.stdout.strip().splitlines()[-1] == 'True'
+
+
+def test_import_does_not_load_tkinter():
+    assert not loads_tkinter("import sys, optimize")
+
+
+@pytest.mark.parametrize('arguments', [['--help'], ['benchmark', '--help'], ['serve', '--help']])
+def test_help_does_not_load_tkinter(arguments):
+    assert not loads_tkinter(f"import sys, optimize\nsys.argv = ['optimize.py', *{arguments!r}]\n"
+                             "try:\n    optimize.main()\nexcept SystemExit:\n    pass")
+
+
+def test_gui_loads_tkinter():
+    pytest.importorskip('tkinter')
+    assert loads_tkinter("import sys, optimize\noptimize.load_tkinter()")
@@ -0,0 +1,111 @@
+"""--incremental skips unchanged sources without decoding them and redoes everything else"""
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+import optimize
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'product.png'
+    optimize.make_synthetic_image(200, 'dense').save(path)
+    return path
+
+
+@pytest.fixture
+def open_counter(monkeypatch):
+    counts = {'open': 0}
+    original_open = optimize.open_source
+
+    def counting_open(*args, **kwargs):
+        counts['open'] += 1
+        return original_open(*args, **kwargs)
+
+    monkeypatch.setattr(optimize, 'open_source', counting_open)
+    return counts
+
+
+def run(source, padding='medium', **exporter_options):
+    processor = optimize.BatchProcessor(optimize.PADDING_PRESETS[padding], jobs=1, incremental=True,
+                                        exporter_options=dict(exporter_options, quiet=True))
+    results = list(processor.run([str(source)]))
+    assert len(results) == 1 and results[0].status in ('ok', 'skipped'), results[0].error
+    return results[0].status
+
+
+def test_unchanged_source_is_skipped_without_decoding(source, open_counter):
+    assert run(source) == 'ok'
+    assert open_counter['open'] == 1
+    assert (source.parent / optimize.MANIFEST_NAME).exists()
+
+    open_counter['open'] = 0
+    assert run(source) == 'skipped'
+    assert open_counter['open'] == 0
+
+
+def test_touched_but_identical_source_is_skipped(source, open_counter):
+    assert run(source) == 'ok'
+    stat = source.stat()
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    open_counter['open'] = 0
+    assert run(source) == 'skipped'
+    assert open_counter['open'] == 0
+
+
+@pytest.mark.parametrize('change', [{'padding': 'small'}, {'png_profile': 'fast'}, {'trim_threshold': 10},
+                                    {'fast_resize': True}, {'strip_megapixels': 0.01}])
+def test_changed_settings_reprocess(source, change):
+    assert run(source) == 'ok'
+    assert run(source, **change) == 'ok'
+    # The new settings are recorded, so the next run with them is skipped
+    assert run(source, **change) == 'skipped'
+
+
+def test_missing_output_reprocesses(source):
+    assert run(source) == 'ok'
+    (source.parent / 'png-padded' / 'product.png').unlink()
+
+    assert run(source) == 'ok'
+    assert (source.parent / 'png-padded' / 'product.png').exists()
+
+
+def test_changed_source_reprocesses(source):
+    assert run(source) == 'ok'
+    optimize.make_synthetic_image(200, 'sparse').save(source)
+
+    assert run(source) == 'ok'
+
+
+def test_resume_after_an_interrupted_run(tmp_path):
+    sources = []
+    for index in range(3):
+        sources.append(tmp_path / f"product{index}.png")
+        optimize.make_synthetic_image(120, 'dense', seed=index).save(sources[-1])
+
+    def statuses():
+        processor = optimize.BatchProcessor(optimize.PADDING_PRESETS['medium'], jobs=1, incremental=True,
+                                            exporter_options={'quiet': True})
+        return {Path(result.path).name: result.status for result in processor.run(map(str, sources))}
+
+    assert set(statuses().values()) == {'ok'}
+    # Killed while appending the last entry: its line is cut off
+    manifest = tmp_path / optimize.MANIFEST_NAME
+    lines = manifest.read_text(encoding='utf-8').splitlines(keepends=True)
+    manifest.write_text(''.join(lines[:2]) + lines[2][:len(lines[2]) // 2], encoding='utf-8')
+    truncated = json.loads(lines[2])['source']
+
+    assert statuses() == {source.name: 'ok' if source.name == truncated else 'skipped' for source in sources}
+    assert set(statuses().values()) == {'skipped'}
+
+
+def test_entry_after_a_truncated_line_is_kept(tmp_path):
+    (tmp_path / optimize.MANIFEST_NAME).write_text('{"source": "a.png", "si', encoding='utf-8')
+    manifest = optimize.OutputManifest(tmp_path)
+    manifest.record(tmp_path / 'b.png', {'size': 1})
+    # Read back before close() compacts the log, as after a second interruption
+    assert list(optimize.OutputManifest(tmp_path).entries) == ['b.png']
+    manifest.close()
@@ -0,0 +1,64 @@
+"""SSIM of JPEG candidates and the quality search built on it"""
+import io
+import random
+
+import pytest
+from PIL import Image, ImageChops
+
+import optimize
+
+
+@pytest.fixture(scope='module')
+def reference():
+    image = optimize.make_synthetic_image(640, 'dense')
+    flattened = Image.new('RGB', image.size, (255, 255, 255))
+    flattened.paste(image, (0, 0), image)
+    return flattened
+
+
+def jpeg(image, quality):
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=quality)
+    return Image.open(io.BytesIO(buffer.getvalue()))
+
+
+def test_identical_image(reference):
+    assert optimize.SsimReference(reference).compare(reference) == pytest.approx(1.0)
+
+
+@pytest.mark.parametrize('size', [(1, 1), (3, 2), (1, 40), (7, 9)])
+def test_images_smaller_than_a_window(size):
+    image = Image.effect_noise(size, 40).convert('RGB')
+    ssim = optimize.SsimReference(image)
+    assert ssim.compare(image) == pytest.approx(1.0)
+    assert ssim.compare(image.point(lambda value: value // 2)) < 0.9
+
+
+def test_blocking_on_the_jpeg_grid_is_measured():
+    # A smooth gradient with a different brightness offset per 8x8 block: windows aligned to the
+    # blocks see only a shifted mean, windows across block edges see the steps
+    image = Image.linear_gradient('L').resize((256, 256)).convert('RGB')
+    rng = random.Random(1)
+    offsets = Image.new('L', (32, 32))
+    offsets.putdata([rng.choice((120, 136)) for _index in range(32 * 32)])
+    blocky = ImageChops.add(image, offsets.resize(image.size, Image.Resampling.NEAREST).convert('RGB'),
+                            offset=-128)
+    assert optimize.SsimReference(image).compare(blocky) < 0.9
+
+
+def test_ssim_grows_with_quality(reference):
+    ssim = optimize.SsimReference(reference)
+    scores = [ssim.compare(jpeg(reference, quality)) for quality in (20, 50, 80, 95)]
+    assert scores == sorted(scores)
+    assert scores[-1] < 1.0
+
+
+def test_search_reaches_target(reference):
+    target = {'ssim': 0.98, 'min_quality': 30, 'max_quality': 100}
+    data, quality, iterations = optimize.search_quality(reference, 'JPEG', {}, target)
+    ssim = optimize.SsimReference(reference)
+    with Image.open(io.BytesIO(data)) as candidate:
+        assert ssim.compare(candidate) >= 0.98
+    if quality > target['min_quality']:
+        assert ssim.compare(jpeg(reference, quality - 1)) < 0.98
+    assert iterations <= 8
@@ -0,0 +1,48 @@
+"""PNG profiles trade encoding time for size but never change pixels; --recompress ends with the max profile's bytes"""
+import io
+
+import pytest
+
+import optimize
+
+
+RENDITIONS = [{'folder': 'png', 'fit': 'trim'}, {'folder': 'png-400', 'fit': 'pad', 'size': 400}]
+
+
+@pytest.fixture(scope='module')
+def image():
+    return optimize.make_synthetic_image(300, 'dense')
+
+
+def decoded(data):
+    with optimize.Image.open(io.BytesIO(data)) as image:
+        return image.mode, image.size, image.tobytes()
+
+
+def export(image, profile):
+    return optimize.export_image(image, renditions=RENDITIONS, png_profile=profile)
+
+
+def test_profiles_only_change_the_encoding(image):
+    outputs = {profile: export(image, profile) for profile in optimize.PNG_PROFILES}
+    for path in outputs['max']:
+        assert len({decoded(outputs[profile][path]) for profile in optimize.PNG_PROFILES}) == 1
+        assert len(outputs['max'][path]) <= len(outputs['balanced'][path]) <= len(outputs['fast'][path])
+        assert outputs['max'][path] != outputs['fast'][path]
+
+
+def test_recompress_ends_with_max_profile_bytes(tmp_path, image):
+    source = tmp_path / 'image.png'
+    image.save(source)
+    processor = optimize.BatchProcessor(optimize.PADDING_PRESETS['large'], jobs=1, recompress_profile='max',
+                                        exporter_options={'quiet': True, 'png_profile': 'fast',
+                                                          'renditions': RENDITIONS})
+    results = list(processor.run([str(source)]))
+    assert [result.status for result in results] == ['ok']
+
+    fast, final = export(image, 'fast'), export(image, 'max')
+    for path, data in final.items():
+        assert (tmp_path / path).read_bytes() == data
+    assert processor.recompress_stats == {
+        'files': 1, 'errors': [],
+        'bytes_saved': sum(len(fast[path]) - len(final[path]) for path in final)}
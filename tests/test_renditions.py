@@ -0,0 +1,35 @@
+"""Rendition definitions are validated up front with ValueError"""
+import pytest
+
+import optimize
+
+
+@pytest.mark.parametrize('padding, expected', [
+    ('small', ['small', 40, 5]),
+    ([20, 5], ['custom', 20, 5]),
+    ([12.5, 0], ['custom', 12.5, 0]),
+    (['medium', 20, 5], ['medium', 20, 5]),
+])
+def test_valid_padding(padding, expected):
+    rendition = optimize.normalize_rendition({'folder': 'pad', 'size': 600, 'padding': padding})
+    assert rendition['padding'] == expected
+    # Normalized renditions normalize to themselves
+    assert optimize.normalize_rendition(rendition) == rendition
+
+
+@pytest.mark.parametrize('padding', [5, 'huge', [5], [1, 2, 3, 4], ['a', 'b'], [True, 5], [-5, 5],
+                                     [60, 50], [50, 50], [10, 50]])
+def test_invalid_padding(padding):
+    with pytest.raises(ValueError):
+        optimize.normalize_rendition({'folder': 'pad', 'size': 600, 'padding': padding})
+
+
+@pytest.mark.parametrize('folder', ['', None, 7, '.', '..', '../x', 'a/b', 'a\\b', '/tmp', 'C:x'])
+def test_invalid_folder(folder):
+    with pytest.raises(ValueError):
+        optimize.normalize_rendition({'folder': folder, 'fit': 'trim'})
+
+
+def test_export_image_rejects_invalid_padding():
+    with pytest.raises(ValueError):
+        optimize.export_image(optimize.Image.new('RGBA', (4, 4)), padding=[60, 50])
@@ -0,0 +1,76 @@
+"""scan_png_files finds sources lazily; --batch --output never lets two sources share outputs"""
+from pathlib import Path
+
+import pytest
+
+import optimize
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for relative in ['a.png', 'B.PNG', 'notes.txt', 'image.png.bak', 'sub/c.png', 'sub/deep/d_main.png',
+                     'drafts/e.png', 'png/f.png', 'jpg/g.png', '.hidden/h.png', 'out/i.png']:
+        path = tmp_path / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'')
+    return tmp_path
+
+
+def scan(root, **options):
+    return sorted(path.relative_to(root).as_posix() for path in optimize.scan_png_files(root, **options))
+
+
+def test_top_level_only_by_default(tree):
+    # The suffix is matched case-insensitively
+    assert scan(tree) == ['B.PNG', 'a.png']
+
+
+def test_recursive_skips_output_and_hidden_folders(tree):
+    assert scan(tree, recursive=True, skip_dirs=[tree / 'out']) == [
+        'B.PNG', 'a.png', 'drafts/e.png', 'sub/c.png', 'sub/deep/d_main.png']
+
+
+def test_include_and_exclude(tree):
+    assert scan(tree, recursive=True, include=['*_main.png', 'a.png'], skip_dirs=[tree / 'out']) == [
+        'a.png', 'sub/deep/d_main.png']
+    assert scan(tree, recursive=True, exclude=['drafts/*', 'sub/*'], skip_dirs=[tree / 'out']) == ['B.PNG', 'a.png']
+
+
+def test_scan_is_lazy(tree):
+    files = optimize.scan_png_files(tree, recursive=True)
+    assert not isinstance(files, list)
+    assert isinstance(next(files), Path)
+
+
+def same_name_sources(tmp_path):
+    sources = []
+    for folder in ('a', 'b'):
+        source = tmp_path / folder / 'x.png'
+        source.parent.mkdir()
+        image = optimize.Image.new('RGBA', (40, 40))
+        image.paste((255, 0, 0, 255) if folder == 'a' else (0, 0, 255, 255), (10, 10, 30, 30))
+        image.save(source)
+        sources.append(str(source))
+    return sources
+
+
+def test_batch_output_mirrors_common_folder(tmp_path, monkeypatch):
+    sources = same_name_sources(tmp_path)
+    monkeypatch.setattr('sys.argv', ['optimize.py', '--batch', *sources, '--output', str(tmp_path / 'out'),
+                                     '--jobs', '1'])
+    optimize.main()
+    for folder in ('a', 'b'):
+        assert (tmp_path / 'out' / folder / 'png' / 'x.png').exists()
+
+
+def test_colliding_outputs_are_rejected_without_source_root(tmp_path):
+    sources = same_name_sources(tmp_path)
+    processor = optimize.BatchProcessor(optimize.PADDING_PRESETS['large'], jobs=1, output_root=tmp_path / 'out',
+                                        exporter_options={'quiet': True})
+    # Results arrive in completion order; the rejected file never waits for a write
+    results = sorted(processor.run(sources), key=lambda result: str(result.path))
+    assert [result.status for result in results] == ['ok', 'error']
+    assert sources[0] in results[1].error
+    # The first file's outputs are untouched
+    red = optimize.Image.open(tmp_path / 'out' / 'png' / 'x.png').convert('RGB').getpixel((5, 5))
+    assert red == (255, 0, 0)
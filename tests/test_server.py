@@ -0,0 +1,146 @@
+"""POST /process rejects malformed requests with 400, full queues with 503 before reading uploads,
+and never lets an upload name into the response headers"""
+import http.client
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+import pytest
+
+import optimize
+
+
+class FakeProcessing:
+    profiles = {'default': []}
+    padding_choice = optimize.PADDING_PRESETS['large']
+    max_upload = 1024
+    allow_paths = True
+
+    def __init__(self):
+        self.calls = []
+        self.free_slots = 1
+
+    def count(self, name, delta=1):
+        pass
+
+    def reserve(self):
+        if not self.free_slots:
+            return False
+        self.free_slots -= 1
+        return True
+
+    def release(self):
+        self.free_slots += 1
+
+    def process(self, png_path, profile, padding_choice, output_dir=None, in_memory=False):
+        self.calls.append((png_path, padding_choice))
+        return optimize.FileResult(str(png_path), 'ok')
+
+
+@pytest.fixture
+def server():
+    processing = FakeProcessing()
+
+    class Handler(optimize.ServerRequestHandler, BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+    Handler.processing = processing
+
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd.server_address[1], processing
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def post(port, body, headers):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    connection.putrequest('POST', '/process')
+    for name, value in headers.items():
+        connection.putheader(name, value)
+    connection.endheaders(body)
+    response = connection.getresponse()
+    data = json.loads(response.read())
+    connection.close()
+    return response.status, data
+
+
+@pytest.mark.parametrize('body', [b'[]', b'"a.png"', b'{"path": "a.png", "padding": [60, 50]}',
+                                  b'{"path": "a.png", "padding": ["a", "b"]}', b'{"path": "a.png", "padding": 5}',
+                                  b'{"path": ["a.png"]}', b'{"path": "a.png", "profile": {}}'])
+def test_invalid_json_requests(server, body):
+    port, processing = server
+    status, data = post(port, body, {'Content-Type': 'application/json', 'Content-Length': str(len(body))})
+    assert status == 400 and 'error' in data
+    assert not processing.calls
+
+
+@pytest.mark.parametrize('length', ['abc', '-5'])
+def test_invalid_content_length(server, length):
+    port, processing = server
+    status, data = post(port, b'', {'Content-Length': length})
+    assert status == 400 and 'Content-Length' in data['error']
+    assert not processing.calls
+
+
+def test_custom_padding_in_json(server):
+    port, processing = server
+    body = json.dumps({'path': 'a.png', 'padding': [10, 5]}).encode()
+    status, _data = post(port, body, {'Content-Type': 'application/json', 'Content-Length': str(len(body))})
+    assert status == 200
+    assert processing.calls == [('a.png', ('custom', 10, 5))]
+
+
+def test_full_queue_is_rejected_before_the_upload_is_read(server):
+    port, processing = server
+    processing.free_slots = 0
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    # Only the headers are sent; the server must answer without waiting for the body
+    connection.putrequest('POST', '/process?name=a.png')
+    connection.putheader('Content-Length', '1000')
+    connection.endheaders()
+    response = connection.getresponse()
+    assert response.status == 503
+    assert response.getheader('Retry-After') == '1'
+    connection.close()
+    assert not processing.calls
+
+
+def test_slot_is_released_after_a_request(server):
+    port, processing = server
+    # The handler releases its slot just after answering, so a second one covers that gap
+    processing.free_slots = 2
+    body = b'{"path": "a.png"}'
+    for _request in range(5):
+        status, _data = post(port, body, {'Content-Type': 'application/json', 'Content-Length': str(len(body))})
+        assert status == 200
+    deadline = time.monotonic() + 5
+    while processing.free_slots != 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert processing.free_slots == 2
+
+
+@pytest.mark.parametrize('name', ['a\r\nSet-Cookie: evil=1', 'a"b', 'größe', 'a;b\\c'])
+def test_content_disposition_is_safe(name):
+    value = optimize.content_disposition(f"{name}.zip")
+    assert value.isascii() and value.isprintable()
+    assert value.count('"') == 2 and 'Set-Cookie:' not in value
+    _fallback, encoded = value.split('; filename*=')
+    assert unquote(encoded[len("UTF-8''"):]) == f"{name}.zip"
+
+
+def test_upload_name_cannot_inject_headers(server, monkeypatch):
+    port, processing = server
+    monkeypatch.setattr(processing, 'process', lambda png_path, *args, **kwargs: optimize.FileResult(
+        str(png_path), 'ok', timings={'total': 0.1}))
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    connection.request('POST', '/process?name=a%0D%0ASet-Cookie:%20evil%3D1%22', body=b'png')
+    response = connection.getresponse()
+    response.read()
+    connection.close()
+    assert response.status == 200
+    assert response.getheader('Set-Cookie') is None
+    assert response.getheader('Content-Disposition').startswith('attachment; filename="a__Set-Cookie_ evil_1_.zip"')
@@ -0,0 +1,112 @@
+"""Sources above strip_megapixels are read in strips and give the same outputs"""
+from pathlib import Path
+
+import pytest
+from PIL import Image, ImageChops, ImageCms
+
+import optimize
+
+
+OUTPUTS = [('png', '.png'), ('png-1080x1080', '.png'), ('png-padded', '.png'), ('jpg', '.jpg')]
+
+
+def export(source, output_dir, strip_megapixels):
+    exporter = optimize.ProductImageExporter(str(source), optimize.PADDING_PRESETS['medium'], quiet=True,
+                                             output_dir=str(output_dir), strip_megapixels=strip_megapixels)
+    assert exporter.process_all(), exporter.error
+    return {folder: Image.open(output_dir / folder / f"{source.stem}{extension}")
+            for folder, extension in OUTPUTS}
+
+
+@pytest.mark.parametrize('density', ['dense', 'sparse', 'opaque'])
+def test_strip_outputs_match_whole_image(tmp_path, density):
+    source = tmp_path / 'product.png'
+    icc_profile = ImageCms.ImageCmsProfile(ImageCms.createProfile('sRGB')).tobytes()
+    optimize.make_synthetic_image(600, density).save(source, icc_profile=icc_profile)
+    
+    whole = export(source, tmp_path / 'whole', 0)
+    strips = export(source, tmp_path / 'strips', 0.1)
+    for folder, image in whole.items():
+        assert strips[folder].mode == image.mode, folder
+        assert ImageChops.difference(strips[folder], image).getbbox() is None, folder
+        # Outputs resized from the strip-wise master keep the source's colour profile too
+        assert strips[folder].info.get('icc_profile') == image.info.get('icc_profile'), folder
+    assert strips['png-1080x1080'].info.get('icc_profile') == icc_profile
+
+
+def test_full_size_output_is_streamed_to_disk(tmp_path):
+    source = tmp_path / 'product.png'
+    optimize.make_synthetic_image(600, 'dense').save(source)
+    
+    exporter = optimize.ProductImageExporter(str(source), optimize.PADDING_PRESETS['medium'], quiet=True,
+                                             strip_megapixels=0.1, write_behind=True)
+    assert exporter.process_all(), exporter.error
+    # Only the canvases are left for the write-behind stage; the full-size PNG is already in place
+    assert sorted(Path(path).parent.name for path, _data in exporter.encoded) == ['jpg', 'png-1080x1080',
+                                                                                 'png-padded']
+    streamed = (tmp_path / 'png' / 'product.png').read_bytes()
+    assert exporter.output_stats[0]['bytes'] == len(streamed)
+    assert not list(tmp_path.glob('png/.*'))
+    
+    # In-memory results get the same bytes
+    outputs = optimize.export_image(str(source), padding='medium', strip_megapixels=0.1)
+    assert outputs[str(Path('png') / 'product.png')] == streamed
+
+
+def test_failed_export_removes_temporary_files(tmp_path, monkeypatch):
+    source = tmp_path / 'product.png'
+    optimize.make_synthetic_image(600, 'dense').save(source)
+    
+    def fail(*args):
+        raise OSError('disk full')
+    monkeypatch.setattr(optimize.ProductImageExporter, 'render_rendition', fail)
+    exporter = optimize.ProductImageExporter(str(source), optimize.PADDING_PRESETS['medium'], quiet=True,
+                                             strip_megapixels=0.1)
+    assert not exporter.process_all()
+    assert not list(tmp_path.glob('png/*'))
+
+
+def test_opened_image_object_is_processed_whole(tmp_path):
+    source = tmp_path / 'product.png'
+    optimize.make_synthetic_image(800, 'dense').save(source)
+    
+    # The caller's image cannot be re-read strip by strip, whatever its size
+    with Image.open(source) as image:
+        outputs = optimize.export_image(image, padding='medium', name='product', strip_megapixels=0.5)
+    assert outputs == optimize.export_image(str(source), padding='medium', strip_megapixels=0)
+
+
+def png_header_only(path, width, height):
+    """A tiny PNG declaring width x height, with a truncated IDAT"""
+    import struct
+    import zlib
+    
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    path.write_bytes(b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0))
+                     + chunk(b'IDAT', zlib.compress(b'\0' * 1000)) + chunk(b'IEND', b''))
+    return path
+
+
+@pytest.mark.parametrize('strip_megapixels', [0, 100])
+def test_declared_size_above_the_cap_is_rejected(tmp_path, strip_megapixels):
+    source = png_header_only(tmp_path / 'bomb.png', 20000, 20000)
+    limit = Image.MAX_IMAGE_PIXELS
+    
+    exporter = optimize.ProductImageExporter(str(source), optimize.PADDING_PRESETS['medium'], quiet=True,
+                                             strip_megapixels=strip_megapixels)
+    assert not exporter.process_all()
+    assert 'MP' in exporter.error
+    # Pillow's global limit is never touched
+    assert Image.MAX_IMAGE_PIXELS == limit
+
+
+def test_cap_applies_to_strip_sources(tmp_path):
+    source = tmp_path / 'product.png'
+    optimize.make_synthetic_image(600, 'dense').save(source)
+    
+    exporter = optimize.ProductImageExporter(str(source), optimize.PADDING_PRESETS['medium'], quiet=True,
+                                             strip_megapixels=0.1, max_megapixels=0.3)
+    assert not exporter.process_all()
+    with pytest.raises(Image.DecompressionBombError):
+        optimize.open_source(str(source), max_pixels=300000)
@@ -0,0 +1,142 @@
+"""--watch processes each settled version of a file once, on both change-detection backends"""
+import importlib.util
+import io
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+import optimize
+
+
+BACKENDS = ['polling', pytest.param('watchdog', marks=pytest.mark.skipif(
+    importlib.util.find_spec('watchdog') is None, reason='watchdog is not installed'))]
+
+
+class WatchRun:
+    """Runs an incremental BatchProcessor over a FolderWatcher in a background thread"""
+    def __init__(self, root, backend, **watcher_options):
+        self.watcher = optimize.FolderWatcher(root, interval=0.05, settle=0.4, backend=backend,
+                                              **watcher_options)
+        self.processor = optimize.BatchProcessor(optimize.PADDING_PRESETS['large'], jobs=1, incremental=True,
+                                                 exporter_options={'quiet': True})
+        self.results = []
+        self.thread = threading.Thread(target=self.consume, daemon=True)
+        self.thread.start()
+
+    def consume(self):
+        for result in self.processor.run(self.watcher):
+            self.results.append(result)
+
+    def statuses(self, name):
+        return [result.status for result in self.results if os.path.basename(str(result.path)) == name]
+
+    def wait_for(self, predicate, timeout=10):
+        deadline = time.monotonic() + timeout
+        while not predicate():
+            if time.monotonic() > deadline:
+                raise AssertionError(f"timed out; results: {[(r.path, r.status) for r in self.results]}")
+            time.sleep(0.05)
+
+    def stop(self):
+        self.watcher.stop()
+        self.thread.join(timeout=10)
+        assert not self.thread.is_alive()
+
+
+def png_bytes(density='dense', seed=0):
+    buffer = io.BytesIO()
+    optimize.make_synthetic_image(120, density, seed).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request):
+    return request.param
+
+
+def test_file_written_in_chunks_waits_until_settled(tmp_path, backend):
+    run = WatchRun(tmp_path, backend)
+    data = png_bytes()
+    chunk = len(data) // 6 + 1
+    try:
+        with open(tmp_path / 'slow.png', 'wb') as f:
+            for start in range(0, len(data), chunk):
+                f.write(data[start:start + chunk])
+                f.flush()
+                time.sleep(0.15)
+                assert not run.results
+        run.wait_for(lambda: run.statuses('slow.png'))
+        time.sleep(0.5)
+        assert run.statuses('slow.png') == ['ok']
+    finally:
+        run.stop()
+
+
+def test_each_version_is_processed_once(tmp_path, backend):
+    source = tmp_path / 'product.png'
+    source.write_bytes(png_bytes(seed=1))
+    run = WatchRun(tmp_path, backend)
+    try:
+        run.wait_for(lambda: run.statuses('product.png') == ['ok'])
+
+        # Touched without a content change: handed out again, but the manifest skips it
+        stat = source.stat()
+        os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        run.wait_for(lambda: len(run.statuses('product.png')) == 2)
+        assert run.statuses('product.png') == ['ok', 'skipped']
+
+        source.write_bytes(png_bytes(seed=2))
+        run.wait_for(lambda: len(run.statuses('product.png')) == 3)
+        time.sleep(0.5)
+        assert run.statuses('product.png') == ['ok', 'skipped', 'ok']
+    finally:
+        run.stop()
+
+
+def test_patterns_and_output_folders_are_skipped(tmp_path, backend):
+    output = tmp_path / 'out'
+    run = WatchRun(tmp_path, backend, recursive=True, include=['*_main.png'], exclude=['drafts/*'],
+                   skip_dirs=[output])
+    try:
+        for relative in ['a_main.png', 'b_other.png', 'drafts/c_main.png', 'png/d_main.png',
+                         'out/e_main.png', '.hidden/f_main.png', 'sub/g_main.png']:
+            path = tmp_path / relative
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(png_bytes())
+        run.wait_for(lambda: len(run.results) >= 2)
+        time.sleep(0.6)
+        assert sorted(os.path.relpath(result.path, tmp_path) for result in run.results) == [
+            'a_main.png', os.path.join('sub', 'g_main.png')]
+    finally:
+        run.stop()
+
+
+def test_stop_ends_the_run(tmp_path, backend):
+    run = WatchRun(tmp_path, backend)
+    time.sleep(0.2)
+    start = time.monotonic()
+    run.stop()
+    assert time.monotonic() - start < 2
+    assert run.results == []
+
+
+def test_run_watch_cli_stops_on_signal(tmp_path, monkeypatch, backend):
+    handlers = {}
+    monkeypatch.setattr(signal, 'signal', lambda signum, handler: handlers.__setitem__(signum, handler))
+    args = type('Args', (), dict(recursive=False, include=None, exclude=None, output=None, watch_interval=0.05,
+                                 settle=0.2, watch_backend=backend, report=None))()
+    processor = optimize.BatchProcessor(optimize.PADDING_PRESETS['large'], jobs=1, incremental=True,
+                                        exporter_options={'quiet': True})
+    (tmp_path / 'a.png').write_bytes(png_bytes())
+
+    def stop_later():
+        while not (tmp_path / 'png' / 'a.png').exists():
+            time.sleep(0.05)
+        handlers[signal.SIGTERM](signal.SIGTERM, None)
+    threading.Thread(target=stop_later, daemon=True).start()
+
+    optimize.run_watch_cli(tmp_path, args, optimize.OUTPUT_FOLDERS, processor)
+    assert (tmp_path / 'jpg' / 'a.jpg').exists()
@@ -0,0 +1,122 @@
+"""WorkQueue hands every task to exactly one worker; shards split a file list disjointly"""
+import threading
+import time
+
+import pytest
+
+import optimize
+
+
+def consume(queue_path, worker, done):
+    work_queue = optimize.WorkQueue(queue_path, lease=5, worker=worker, poll_interval=0.01)
+    try:
+        for path in work_queue:
+            if path is optimize.WATCH_IDLE:
+                continue
+            done.append((worker, path))
+            work_queue.complete(optimize.FileResult(path, 'ok'))
+    finally:
+        work_queue.close()
+
+
+def test_two_consumers_process_every_file_once(tmp_path):
+    queue_path = tmp_path / 'jobs.queue'
+    files = [f"/images/{index}.png" for index in range(200)]
+    producer = optimize.WorkQueue(queue_path)
+    assert producer.add(files) == 200
+    # Adding the same files again does nothing
+    assert producer.add(files[:10]) == 0
+    producer.close()
+
+    done = []
+    workers = [threading.Thread(target=consume, args=(queue_path, name, done)) for name in ('a', 'b')]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert sorted(path for _worker, path in done) == sorted(files)
+    work_queue = optimize.WorkQueue(queue_path)
+    assert work_queue.counts() == {'pending': 0, 'leased': 0, 'done': 200, 'failed': 0}
+    work_queue.close()
+
+
+def test_expired_lease_is_claimed_again(tmp_path):
+    queue_path = tmp_path / 'jobs.queue'
+    crashed = optimize.WorkQueue(queue_path, lease=0.2, worker='crashed')
+    other = optimize.WorkQueue(queue_path, lease=0.2, worker='other')
+    crashed.add(['a.png'])
+
+    assert crashed.claim() == 'a.png'
+    assert other.claim() is None
+    time.sleep(0.3)
+    assert other.claim() == 'a.png'
+
+    # The first worker lost its lease, so its late result is ignored
+    crashed.complete(optimize.FileResult('a.png', 'error', error='late'))
+    assert other.counts()['leased'] == 1
+    other.complete(optimize.FileResult('a.png', 'ok'))
+    assert other.counts()['done'] == 1
+    other.connection.close()
+    crashed.connection.close()
+
+
+def test_failures_stop_after_max_attempts(tmp_path):
+    work_queue = optimize.WorkQueue(tmp_path / 'jobs.queue', max_attempts=2, worker='w')
+    work_queue.add(['bad.png'])
+
+    for _attempt in range(2):
+        assert work_queue.claim() == 'bad.png'
+        work_queue.complete(optimize.FileResult('bad.png', 'error', error='broken'))
+    assert work_queue.claim() is None
+    assert work_queue.counts()['failed'] == 1
+    row = work_queue.connection.execute('SELECT attempts, error FROM tasks').fetchone()
+    assert (row['attempts'], row['error']) == (2, 'broken')
+    work_queue.close()
+
+
+def test_lease_expired_on_last_attempt_fails(tmp_path):
+    work_queue = optimize.WorkQueue(tmp_path / 'jobs.queue', lease=0.1, max_attempts=1, worker='w')
+    work_queue.add(['crash.png'])
+
+    assert work_queue.claim() == 'crash.png'
+    time.sleep(0.2)
+    assert work_queue.claim() is None
+    assert work_queue.counts()['failed'] == 1
+    work_queue.close()
+
+
+def test_close_hands_back_unfinished_tasks(tmp_path):
+    queue_path = tmp_path / 'jobs.queue'
+    work_queue = optimize.WorkQueue(queue_path, worker='w')
+    work_queue.add(['a.png'])
+    assert work_queue.claim() == 'a.png'
+    work_queue.close()
+
+    work_queue = optimize.WorkQueue(queue_path, worker='v')
+    assert work_queue.claim() == 'a.png'
+    # Handing back does not use up an attempt
+    assert work_queue.connection.execute('SELECT attempts FROM tasks').fetchone()['attempts'] == 1
+    work_queue.close()
+
+
+@pytest.mark.parametrize('count', [1, 3, 4])
+def test_shards_are_disjoint_and_complete(tmp_path, count):
+    files = [tmp_path / f"sku{index}" / f"{index}.png" for index in range(300)]
+    shards = [[file_path for file_path in files if optimize.in_shard(file_path, (index, count), tmp_path)]
+              for index in range(1, count + 1)]
+
+    assert sorted(sum(shards, [])) == sorted(files)
+    assert sum(len(shard) for shard in shards) == len(files)
+    if count > 1:
+        assert all(shards)
+    # Relative to the root, the split does not depend on where the folder is mounted
+    moved = [optimize.in_shard(tmp_path / 'elsewhere' / file_path.relative_to(tmp_path), (1, count),
+                               tmp_path / 'elsewhere') for file_path in files]
+    assert moved == [file_path in shards[0] for file_path in files]
+
+
+def test_incremental_is_rejected_with_shard(tmp_path, monkeypatch):
+    monkeypatch.setattr('sys.argv', ['optimize.py', '--folder', str(tmp_path), '--shard', '1/2', '--incremental'])
+    with pytest.raises(SystemExit):
+        optimize.main()
@@ -0,0 +1,92 @@
+"""Outputs are committed atomically by the write-behind stage, and a file is reported only
+once all of its outputs are on disk"""
+import os
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+import optimize
+
+
+def test_atomic_write_renames_a_complete_temporary_file(tmp_path, monkeypatch):
+    target = tmp_path / 'out.png'
+    replaced = []
+    original_replace = os.replace
+
+    def checking_replace(source, destination):
+        # The target does not exist yet, and the temporary file already holds everything
+        assert not Path(destination).exists()
+        assert Path(source).read_bytes() == b'data' * 1000
+        replaced.append((Path(source), Path(destination)))
+        original_replace(source, destination)
+    monkeypatch.setattr(os, 'replace', checking_replace)
+
+    optimize.atomic_write(target, b'data' * 1000)
+    assert replaced == [(optimize.temporary_path(target), target)]
+    assert Path(replaced[0][0]).name.startswith('.')
+    assert target.read_bytes() == b'data' * 1000
+
+
+def test_failed_write_leaves_no_files(tmp_path, monkeypatch):
+    def failing_replace(source, destination):
+        raise OSError('disk full')
+    monkeypatch.setattr(os, 'replace', failing_replace)
+
+    with pytest.raises(OSError):
+        optimize.atomic_write(tmp_path / 'out.png', b'data')
+    assert list(tmp_path.iterdir()) == []
+
+
+def make_source(tmp_path, name='product.png'):
+    source = tmp_path / name
+    optimize.make_synthetic_image(120, 'dense').save(source)
+    return source
+
+
+def processor():
+    return optimize.BatchProcessor(optimize.PADDING_PRESETS['large'], jobs=1, io_threads=2,
+                                   exporter_options={'quiet': True})
+
+
+def test_failed_output_write_fails_the_file(tmp_path, monkeypatch):
+    source = make_source(tmp_path)
+    original_write = optimize.atomic_write
+
+    def failing_write(path, data):
+        if Path(path).suffix == '.jpg':
+            raise OSError('disk full')
+        original_write(path, data)
+    monkeypatch.setattr(optimize, 'atomic_write', failing_write)
+
+    results = list(processor().run([str(source)]))
+    assert [result.status for result in results] == ['error']
+    assert 'disk full' in results[0].error
+
+
+def test_results_are_reported_after_their_outputs_are_committed(tmp_path, monkeypatch):
+    sources = [str(make_source(tmp_path, f"product{index}.png")) for index in range(3)]
+    gate = threading.Event()
+    original_commit = optimize.OutputWriter.commit
+
+    def gated_commit(self, path, data):
+        gate.wait(10)
+        original_commit(self, path, data)
+    monkeypatch.setattr(optimize.OutputWriter, 'commit', gated_commit)
+
+    reported = []
+
+    def consume():
+        for result in processor().run(sources):
+            # Every output must already be in place when the result arrives
+            reported.append((result.status, len(result.outputs),
+                             all(Path(output).exists() for output in result.outputs)))
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    time.sleep(0.5)
+    assert reported == []
+
+    gate.set()
+    consumer.join(30)
+    assert reported == [('ok', 4, True)] * 3